@@ -1,8 +1,88 @@
 import smbus2
 import json
 import os
-import glob
 import math
+import struct
+import threading
+import numpy as np
+
+# numba is optional, without it the PMBus decoders below run as plain Python
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+    def njit(*args, **kwargs):
+        return lambda fn: fn
+
+# orjson is optional, it parses the board config straight from bytes
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+# PMBus words come back little-endian
+_U16 = struct.Struct('<H')
+PMBUS_PAGE = 0x00
+
+# Regulator paths found so far by name, shared so later HAL instances skip the scan. Misses aren't
+# stored, a regulator that wasn't there yet (e.g. driver still probing) is looked for again next time
+_REGULATOR_PATHS = {}
+
+def _scan_regulator(target_name, base="/sys/class/regulator"):
+    """ Scans the regulator class for a name match """
+    if not os.path.exists(base): return None
+    with os.scandir(base) as it:
+        entries = [e.path for e in it if e.name.startswith("regulator.")]
+    for r in entries:
+        try:
+            with open(os.path.join(r, "name"), 'r') as f:
+                if target_name.lower() in f.read(64).strip().lower():
+                    return os.path.join(r, "microvolts")
+        except: continue
+    return None
+
+@njit(cache=True)
+def _decode_linear11(raw_word):
+    exp = (raw_word >> 11) & 0x1F
+    if exp > 15: exp -= 32 
+    mant = raw_word & 0x7FF
+    if mant > 1023: mant -= 2048
+    return math.ldexp(float(mant), exp)
+
+@njit(cache=True)
+def _decode_linear16(raw_word, fixed_exp=-12):
+    return math.ldexp(float(raw_word), fixed_exp)
+
+# Current encodings understood by _decode_vip
+I_NONE, I_LINEAR11, I_SCALED = 0, 1, 2
+
+@njit(cache=True)
+def _decode_vip(raw_v, raw_i, v_inv_scale, i_code, i_inv_scale, out_v, out_i, out_p):
+    """ Decodes raw voltage/current words into voltage, current and power in a single pass (v_inv_scale 0 = Linear16) """
+    for k in range(raw_v.shape[0]):
+        if v_inv_scale > 0.0:
+            vv = raw_v[k] * v_inv_scale
+        else:
+            vv = _decode_linear16(int(raw_v[k]))
+        if i_code == I_LINEAR11:
+            ii = _decode_linear11(int(raw_i[k]))
+        elif i_code == I_SCALED:
+            ii = raw_i[k] * i_inv_scale
+        else:
+            ii = 0.0
+        out_v[k] = vv
+        out_i[k] = ii
+        out_p[k] = vv * ii
+
+def _linear11_np(raw_words):
+    """ Vectorised Linear11 decode, the no-numba fallback """
+    w = raw_words.astype(np.int32)
+    exp = (w >> 11) & 0x1F
+    exp = np.where(exp > 15, exp - 32, exp)
+    mant = w & 0x7FF
+    mant = np.where(mant > 1023, mant - 2048, mant)
+    return np.ldexp(mant.astype(np.float64), exp)
 
 class BoardHAL:
     def __init__(self, config_path):
@@ -13,8 +93,8 @@ class BoardHAL:
         if not os.path.exists(config_path):
             raise FileNotFoundError(f"Config file {config_path} not found.")
 
-        with open(config_path, 'r') as f:
-            self.full_config = json.load(f) # Get JSON information
+        with open(config_path, 'rb') as f:
+            self.full_config = _json_loads(f.read()) # Get JSON information
 
         self.board_name = self.full_config.get('selected_board')
         if not self.board_name or self.board_name not in self.full_config['boards']:
@@ -25,6 +105,22 @@ class BoardHAL:
         
         print(f"[HAL] Initializing {self.config.get('name', self.board_name)}...")
 
+        # Telemetry reader for each driver type, looked up once per read_telemetry call
+        self._reader_by_type = {
+            'pmbus': self._read_pmbus,
+            'sysfs_monitor': self._read_sysfs_monitor,
+            'sysfs_regulator': self._read_sysfs_regulator,
+        }
+
+        # Rails on the same I2C bus share one SMBus handle and one lock
+        self._bus_cache = {}
+        self._bus_locks = {}
+        # Last PAGE written to each device address, per bus (multi-rail controllers)
+        self._bus_pages = {}
+
+        # hwmon driver name -> device directory, scanned once per search directory
+        self._hwmon_index = {}
+
         self.rails = {}
         for r_name, r_conf in self.config['rails'].items():
             self.rails[r_name] = self._init_rail_controller(r_name, r_conf)
@@ -35,21 +131,88 @@ class BoardHAL:
             'conf': conf,
             'type': conf.get('driver_type', 'sysfs_monitor'),
             'bus': None,
-            'paths': {}
+            'lock': None,
+            'paths': {},
+            'fds': {}
         }
 
+        # Decode hex address/commands once so the telemetry and write paths don't re-parse them
+        if 'address' in conf.get('connection', {}):
+            ctrl['addr'] = int(conf['connection']['address'], 16)
+        ctrl['cmd_ints'] = {k: int(v, 16) for k, v in conf.get('commands', {}).items()}
+        ctrl['cmd_rv'] = ctrl['cmd_ints'].get('read_voltage')
+        ctrl['cmd_ri'] = ctrl['cmd_ints'].get('read_current')
+        ctrl['cmd_sv'] = ctrl['cmd_ints'].get('set_voltage')
+        ctrl['fmt'] = conf.get('format', {})
+
+        # Safety limits as plain floats for the set_voltage bounds check
+        lim = conf.get('limits', {})
+        ctrl['lim_min'] = float(lim.get('min', 0.0))
+        ctrl['lim_max'] = float(lim.get('max', 99.0))
+
         # Hardware Bus (PMBus / Raw I2C)
         if ctrl['type'] in ['pmbus', 'raw_i2c']:
             bus_id = conf['connection'].get('bus_id')
             if bus_id is None:
                 raise ValueError(f"Rail '{name}' missing 'bus_id' in connection config.")
-            try:
-                ctrl['bus'] = smbus2.SMBus(bus_id)
-            except Exception as e:
-                print(f"[HAL] Warning: Failed to open I2C Bus {bus_id} for {name}: {e}")
+            if bus_id not in self._bus_cache:
+                try:
+                    self._bus_cache[bus_id] = smbus2.SMBus(bus_id)
+                    self._bus_locks[bus_id] = threading.Lock()
+                    self._bus_pages[bus_id] = {}
+                except Exception as e:
+                    print(f"[HAL] Warning: Failed to open I2C Bus {bus_id} for {name}: {e}")
+            ctrl['bus'] = self._bus_cache.get(bus_id)
+            ctrl['lock'] = self._bus_locks.get(bus_id)
+            ctrl['pages'] = self._bus_pages.get(bus_id)
+            ctrl['page'] = conf['connection'].get('page')
+
+            # Check the voltage encoding is fully described now rather than on the first write
+            fmt = ctrl['fmt']
+            if ctrl['type'] == 'pmbus':
+                if fmt.get('voltage_mode') == 'linear16_fixed':
+                    if 'scale_factor' not in fmt:
+                        raise ValueError(f"Rail '{name}' uses 'linear16_fixed' but has no 'scale_factor' in format config.")
+                    ctrl['scale'] = fmt['scale_factor']
+                    ctrl['inv_scale'] = 1.0 / ctrl['scale']
+                else:
+                    # Generic Linear16 (fixed exponent of -12, same as _decode_linear16); reads go through the decoder
+                    ctrl['scale'] = fmt.get('scale_factor', 1 << 12)
+                    ctrl['inv_scale'] = None
+
+                # Limits as the VOUT_COMMAND codes they encode to, so writes are checked on the value actually sent
+                ctrl['raw_min'] = max(0, int(ctrl['lim_min'] * ctrl['scale']))
+                ctrl['raw_max'] = min(0xFFFF, int(ctrl['lim_max'] * ctrl['scale']))
+
+                ctrl['i_mode'] = fmt.get('current_mode')
+                ctrl['i_inv_scale'] = None
+                ctrl['i_code'] = I_NONE
+                if ctrl['cmd_ri'] is not None:
+                    if ctrl['i_mode'] == 'linear11':
+                        ctrl['i_code'] = I_LINEAR11
+                    elif ctrl['i_mode'] == 'linear16_fixed':
+                        ctrl['i_code'] = I_SCALED
+                if ctrl['i_mode'] == 'linear16_fixed':
+                    if 'current_scale_factor' not in fmt:
+                        raise ValueError(f"Rail '{name}' uses 'linear16_fixed' current but has no 'current_scale_factor' in format config.")
+                    ctrl['i_inv_scale'] = 1.0 / fmt['current_scale_factor']
+
+                # Telemetry goes out as one combined transaction: [PAGE] + VOUT (+ IOUT)
+                addr = ctrl['addr']
+                msgs = [smbus2.i2c_msg.write(addr, [ctrl['cmd_rv']]), smbus2.i2c_msg.read(addr, 2)]
+                if ctrl['cmd_ri'] is not None:
+                    msgs += [smbus2.i2c_msg.write(addr, [ctrl['cmd_ri']]), smbus2.i2c_msg.read(addr, 2)]
+                ctrl['rd_msgs'] = msgs
+                if ctrl['page'] is not None:
+                    ctrl['page_msg'] = smbus2.i2c_msg.write(addr, [PMBUS_PAGE, ctrl['page']])
+            if ctrl['type'] == 'raw_i2c':
+                if fmt.get('base_v') is None or fmt.get('step_v') is None:
+                    raise ValueError(f"Rail '{name}' missing 'base_v' or 'step_v' in format config.")
+                ctrl['inv_step'] = 1.0 / fmt['step_v']
 
         # Linux regulator (write)
         elif ctrl['type'] == 'sysfs_regulator':
+            ctrl['unit_div'] = ctrl['fmt'].get('unit_div', 1000000.0)
             target = conf['connection'].get('regulator_name') 
             path = conf['connection'].get('sysfs_path')       
             
@@ -72,127 +235,217 @@ class BoardHAL:
             match_name = conf['connection'].get('driver_match')
             base_search = conf['connection'].get('search_dir', "/sys/class/hwmon") # Default to std linux location
             
-            found = False
-            # Search for the sensor driver
-            for hwmon in glob.glob(os.path.join(base_search, "hwmon*")):
-                try:
-                    with open(os.path.join(hwmon, "name"), 'r') as f:
-                        if match_name in f.read().strip():
-                            ctrl['paths']['root'] = hwmon
-                            found = True
-                            break
-                except: continue
-            if not found:
+            index = self._hwmon_index.get(base_search)
+            if index is None:
+                index = self._hwmon_index[base_search] = self._scan_hwmon(base_search)
+
+            # Exact driver name first, then the substring match the configs have always allowed
+            hwmon = index.get(match_name)
+            if hwmon is None:
+                hwmon = next((path for drv, path in index.items() if match_name in drv), None)
+            if hwmon is None:
                 print(f"[HAL] Warning: Monitor driver '{match_name}' not found.")
+            else:
+                ctrl['paths']['root'] = hwmon
+                # Keep the sensor files open, read_telemetry re-reads them from offset 0 with os.pread
+                f_map = conf.get('files', {})
+                ctrl['v_scale'] = 1.0 / f_map.get('voltage_div', 1.0)
+                ctrl['c_scale'] = 1.0 / f_map.get('current_div', 1.0)
+                ctrl['p_scale'] = 1.0 / f_map.get('power_div', 1.0)
+                for key in ('voltage', 'current', 'power'):
+                    if key in f_map:
+                        try:
+                            ctrl['fds'][key] = os.open(os.path.join(ctrl['paths']['root'], f_map[key]), os.O_RDONLY)
+                        except OSError as e:
+                            print(f"[HAL] Warning: Could not open {f_map[key]} for {name}: {e}")
 
         return ctrl
 
     def read_telemetry(self, rail_name):
         """ Returns {'voltage_v': float, 'current_a': float, 'power_w': float} """
-        if rail_name not in self.rails: return None
+        c = self.rails.get(rail_name)
+        if c is None: return None
+        
+        reader = self._reader_by_type.get(c['type'])
+        if reader is None:
+            return {"voltage_v": 0.0, "current_a": 0.0, "power_w": 0.0}
+        return reader(c)
+
+    def has_raw_telemetry(self, rail_name):
+        """ True if the rail can be sampled as raw words with read_raw_telemetry_into (PMBus rails with an open bus) """
+        c = self.rails.get(rail_name)
+        return c is not None and c['type'] == 'pmbus' and c['bus'] is not None
+
+    def read_raw_telemetry_into(self, rail_name, buf, offset):
+        """
+        Copies the undecoded little-endian voltage and current words of a PMBus rail into buf[offset:offset + 4].
+        The current word is zero if the rail has no read_current command. Returns False if the read failed.
+        """
         c = self.rails[rail_name]
-        v, i, p = 0.0, 0.0, 0.0
+        if not self._pmbus_transfer(c):
+            return False
+        msgs = c['rd_msgs']
+        buf[offset:offset + 2] = bytes(msgs[1])
+        buf[offset + 2:offset + 4] = bytes(msgs[3]) if len(msgs) == 4 else b'\x00\x00'
+        return True
 
-        try:
-            # PMBus reading
-            if c['type'] == 'pmbus' and c['bus']:
-                addr = int(c['conf']['connection']['address'], 16)
-                cmds = c['conf']['commands']
-                fmt = c['conf']['format']
+    def decode_raw_telemetry(self, rail_name, raw_v, raw_i):
+        """ Decodes arrays of raw words from read_raw_telemetry_into into (voltage, current, power) float arrays """
+        c = self.rails[rail_name]
+        n = len(raw_v)
 
-                # Voltage decoding
-                raw_v = c['bus'].read_word_data(addr, int(cmds['read_voltage'], 16))
-                
-                if fmt.get('voltage_mode') == 'linear16_fixed':
-                     scale = fmt.get('scale_factor')
-                     v = raw_v / scale
-                else:
-                     v = self._decode_linear16(raw_v)
+        if HAVE_NUMBA:
+            out = np.empty((3, n))
+            _decode_vip(raw_v, raw_i, c['inv_scale'] or 0.0, c['i_code'], c['i_inv_scale'] or 0.0, out[0], out[1], out[2])
+            return out[0], out[1], out[2]
 
-                # Current decoding
-                if 'read_current' in cmds:
-                    raw_i = c['bus'].read_word_data(addr, int(cmds['read_current'], 16))
-                    
-                    if fmt.get('current_mode') == 'linear11':
-                        i = self._decode_linear11(raw_i)
-                    elif fmt.get('current_mode') == 'linear16_fixed':
-                        scale = fmt.get('current_scale_factor')
-                        i = raw_i / scale
-                    else:
-                        i = 0.0 # Couldn't handle format
+        # numpy fallback, one vectorised expression per column
+        if c['inv_scale'] is not None:
+            v = raw_v * c['inv_scale']
+        else:
+            v = np.ldexp(raw_v.astype(np.float64), -12)
 
-                p = v * i
+        if c['i_code'] == I_LINEAR11:
+            i = _linear11_np(raw_i)
+        elif c['i_code'] == I_SCALED:
+            i = raw_i * c['i_inv_scale']
+        else:
+            i = np.zeros(n)
 
-            # SYSFS monitor reading
-            elif c['type'] == 'sysfs_monitor' and 'root' in c['paths']:
-                f_map = c['conf']['files']
-                root = c['paths']['root']
-                
-                # Retrieve divisors from JSON
-                v_div = f_map.get('voltage_div', 1.0)
-                c_div = f_map.get('current_div', 1.0)
-                p_div = f_map.get('power_div', 1.0)
-
-                if 'voltage' in f_map:
-                    with open(os.path.join(root, f_map['voltage']), 'r') as f:
-                        v = float(f.read()) / v_div
-                
-                if 'current' in f_map:
-                    with open(os.path.join(root, f_map['current']), 'r') as f:
-                        i = float(f.read()) / c_div
-                
-                if 'power' in f_map:
-                    with open(os.path.join(root, f_map['power']), 'r') as f:
-                        p = float(f.read()) / p_div
+        return v, i, v * i
+
+    def _pmbus_transfer(self, c):
+        """ Runs the rail's combined telemetry transaction, the replies land in c['rd_msgs']. False on a bus error """
+        msgs = c['rd_msgs']
+        pages = c['pages']
+        page = c['page']
+
+        # Hold the bus lock so another thread can't interleave a PMBus command
+        try:
+            with c['lock']:
+                # Only re-select the PAGE when another rail on this device moved it
+                if page is not None and pages.get(c['addr']) != page:
+                    c['bus'].i2c_rdwr(c['page_msg'], *msgs)
+                    pages[c['addr']] = page
                 else:
-                    p = v * i
+                    c['bus'].i2c_rdwr(*msgs)
+        except OSError:
+            pages.pop(c['addr'], None)
+            return False
+        return True
 
-            # SYSFS regulator reading (voltage)
-            elif c['type'] == 'sysfs_regulator' and 'microvolts' in c['paths']:
-                # Get unit division from JSON
-                unit_div = c['conf']['format'].get('unit_div', 1000000.0) 
-                
-                with open(c['paths']['microvolts'], 'r') as f:
-                    v = float(f.read()) / unit_div
-                i = 0.0 
-                p = 0.0
+    def _read_pmbus_words(self, c):
+        """ Returns (raw voltage, raw current or None) from one combined transaction, or None on a bus error """
+        if not self._pmbus_transfer(c):
+            return None
+        msgs = c['rd_msgs']
+        raw_i = None
+        raw_v = _U16.unpack(bytes(msgs[1]))[0]
+        if len(msgs) == 4:
+            raw_i = _U16.unpack(bytes(msgs[3]))[0]
+        return raw_v, raw_i
 
+    def _read_pmbus(self, c):
+        """ PMBus reading """
+        if not c['bus']:
+            return {"voltage_v": 0.0, "current_a": 0.0, "power_w": 0.0}
+        words = self._read_pmbus_words(c)
+        if words is None:
+            return None
+        raw_v, raw_i = words
+
+        # Voltage decoding
+        inv_scale = c['inv_scale']
+        if inv_scale is not None:
+             v = raw_v * inv_scale
+        else:
+             v = self._decode_linear16(raw_v)
+
+        # Current decoding
+        i = 0.0
+        if raw_i is not None:
+            if c['i_mode'] == 'linear11':
+                i = self._decode_linear11(raw_i)
+            elif c['i_inv_scale'] is not None:
+                i = raw_i * c['i_inv_scale']
+            # Any other format is left at 0.0 (couldn't handle format)
+
+        return {"voltage_v": v, "current_a": i, "power_w": v * i}
+
+    def _read_sysfs_monitor(self, c):
+        """ SYSFS monitor reading """
+        v, i, p = 0.0, 0.0, 0.0
+        if 'root' not in c['paths']:
             return {"voltage_v": v, "current_a": i, "power_w": p}
+        fds = c['fds']
 
-        except Exception as e:
+        try:
+            if 'voltage' in fds:
+                v = float(os.pread(fds['voltage'], 32, 0)) * c['v_scale']
+            
+            if 'current' in fds:
+                i = float(os.pread(fds['current'], 32, 0)) * c['c_scale']
+            
+            if 'power' in fds:
+                p = float(os.pread(fds['power'], 32, 0)) * c['p_scale']
+            else:
+                p = v * i
+        except (OSError, ValueError):
+            # Attribute not readable yet or returned a partial value
+            return None
+
+        return {"voltage_v": v, "current_a": i, "power_w": p}
+
+    def _read_sysfs_regulator(self, c):
+        """ SYSFS regulator reading (voltage only) """
+        if 'microvolts' not in c['paths']:
+            return {"voltage_v": 0.0, "current_a": 0.0, "power_w": 0.0}
+        
+        try:
+            with open(c['paths']['microvolts'], 'r') as f:
+                v = float(f.read()) / c['unit_div']
+        except (OSError, ValueError):
             return None
+        return {"voltage_v": v, "current_a": 0.0, "power_w": 0.0}
 
     def set_voltage(self, rail_name, voltage_v):
         if rail_name not in self.rails: return False
         c = self.rails[rail_name]
         
-        # Bounds check
-        lim = c['conf'].get('limits', {})
-        if not (lim.get('min', 0.0) <= voltage_v <= lim.get('max', 99.0)):
+        # Bounds check, PMBus rails compare the encoded word against the precomputed raw limits
+        if c['type'] == 'pmbus':
+            raw_val = int(voltage_v * c['scale'])
+            in_bounds = c['raw_min'] <= raw_val <= c['raw_max']
+        else:
+            in_bounds = c['lim_min'] <= voltage_v <= c['lim_max']
+        if not in_bounds:
             print(f"[HAL] Safety Trip: {voltage_v}V is outside limits for {rail_name}")
             return False
 
         try:
             # PMBus write
             if c['type'] == 'pmbus' and c['bus']:
-                addr = int(c['conf']['connection']['address'], 16)
-                cmd = int(c['conf']['commands']['set_voltage'], 16)
-                fmt = c['conf']['format']
-
-                if fmt.get('voltage_mode') == 'linear16_fixed':
-                    scale = fmt.get('scale_factor')
-                    raw_val = int(voltage_v * scale)
-                else:
-                    # Generic Linear16 encoding
-                    raw_val = int(voltage_v * scale)
-
-                c['bus'].write_word_data(addr, cmd, raw_val)
+                with c['lock']:
+                    if c['page'] is None:
+                        c['bus'].write_word_data(c['addr'], c['cmd_sv'], raw_val)
+                    else:
+                        # PAGE select and VOUT_COMMAND go out as one burst, PAGE skipped if already selected
+                        vout = smbus2.i2c_msg.write(c['addr'], [c['cmd_sv'], raw_val & 0xFF, (raw_val >> 8) & 0xFF])
+                        pages = c['pages']
+                        try:
+                            if pages.get(c['addr']) != c['page']:
+                                c['bus'].i2c_rdwr(c['page_msg'], vout)
+                                pages[c['addr']] = c['page']
+                            else:
+                                c['bus'].i2c_rdwr(vout)
+                        except OSError:
+                            pages.pop(c['addr'], None)
+                            raise
                 return True
 
             # SYSFS regulator write
             elif c['type'] == 'sysfs_regulator' and 'microvolts' in c['paths']:
-                unit_div = c['conf']['format'].get('unit_div', 1000000.0)
-                raw_val = int(voltage_v * unit_div)
+                raw_val = int(voltage_v * c['unit_div'])
                 
                 with open(c['paths']['microvolts'], 'w') as f:
                     f.write(str(raw_val))
@@ -200,31 +453,23 @@ class BoardHAL:
 
             # Raw I2C (VID) write
             elif c['type'] == 'raw_i2c' and c['bus']:
-                addr = int(c['conf']['connection']['address'], 16)
-                reg = int(c['conf']['commands']['voltage_reg'], 16)
-                fmt = c['conf']['format']
-                
-                # VID: Value = (Target - Base) / Step
-                base = fmt.get('base_v')
-                step = fmt.get('step_v')
+                addr = c['addr']
+                reg = c['cmd_ints']['voltage_reg']
+                fmt = c['fmt']
                 
-                if base is None or step is None:
-                    print(f"[HAL] Error: 'base_v' or 'step_v' missing in JSON for {rail_name}")
-                    return False
-
-                if voltage_v < base: vid = 0
-                else: vid = int(round((voltage_v - base) / step))
+                # VID: Value = (Target - Base) / Step, clamped at 0 below the base voltage
+                vid = max(0, int(round((voltage_v - fmt['base_v']) * c['inv_step'])))
                 
-                # Write voltage
-                c['bus'].write_byte_data(addr, reg, vid)
-                
-                # Trigger/Update register (Fully JSON driven)
-                if 'update_reg' in c['conf']['commands']:
-                    up_reg = int(c['conf']['commands']['update_reg'], 16)
-                    up_val_str = c['conf']['commands'].get('update_value', '0x01')
-                    up_val = int(up_val_str, 16)
+                with c['lock']:
+                    # Write voltage
+                    c['bus'].write_byte_data(addr, reg, vid)
                     
-                    c['bus'].write_byte_data(addr, up_reg, up_val)
+                    # Trigger/Update register (Fully JSON driven)
+                    if 'update_reg' in c['cmd_ints']:
+                        up_reg = c['cmd_ints']['update_reg']
+                        up_val = c['cmd_ints'].get('update_value', 0x01)
+                        
+                        c['bus'].write_byte_data(addr, up_reg, up_val)
                 
                 return True
 
@@ -234,24 +479,44 @@ class BoardHAL:
         
         return False
 
+    def close(self):
+        """ Closes the sensor file descriptors held open by the monitor rails and each shared I2C bus """
+        for c in self.rails.values():
+            for fd in c['fds'].values():
+                os.close(fd)
+            c['fds'] = {}
+        for bus in self._bus_cache.values():
+            bus.close()
+        self._bus_cache = {}
+
     # Helper functions
-    def _find_regulator_by_name(self, target_name):
-        base = "/sys/class/regulator"
-        if not os.path.exists(base): return None
-        for r in glob.glob(os.path.join(base, "regulator.*")):
+    @staticmethod
+    def _scan_hwmon(base):
+        """ Single pass over the hwmon class directory, returns {driver name: hwmon path} """
+        index = {}
+        try:
+            with os.scandir(base) as it:
+                entries = sorted(e.path for e in it if e.name.startswith("hwmon"))
+        except OSError:
+            return index
+        for hwmon in entries:
             try:
-                with open(os.path.join(r, "name"), 'r') as f:
-                    if target_name.lower() in f.read().strip().lower():
-                        return os.path.join(r, "microvolts")
-            except: continue
-        return None
-
-    def _decode_linear11(self, raw_word):
-        exp = (raw_word >> 11) & 0x1F
-        if exp > 15: exp -= 32 
-        mant = raw_word & 0x7FF
-        if mant > 1023: mant -= 2048
-        return mant * (2.0 ** exp)
-
-    def _decode_linear16(self, raw_word, fixed_exp=-12):
-        return raw_word * (2.0 ** fixed_exp)
\ No newline at end of file
+                with open(os.path.join(hwmon, "name"), 'r') as f:
+                    # Keep the first device when two share a driver name
+                    index.setdefault(f.read(64).strip(), hwmon)
+            except OSError: continue
+        return index
+
+    def _find_regulator_by_name(self, target_name):
+        path = _REGULATOR_PATHS.get(target_name)
+        # Regulator numbering can change between boots, so re-scan if the cached path has gone
+        if path is None or not os.path.exists(path):
+            path = _scan_regulator(target_name)
+            if path is None:
+                _REGULATOR_PATHS.pop(target_name, None)
+            else:
+                _REGULATOR_PATHS[target_name] = path
+        return path
+
+    _decode_linear11 = staticmethod(_decode_linear11)
+    _decode_linear16 = staticmethod(_decode_linear16)
\ No newline at end of file
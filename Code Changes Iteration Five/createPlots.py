@@ -3,6 +3,24 @@ import matplotlib.pyplot as plt
 import numpy as np
 import os
 
+# Use the columnar pyarrow CSV reader when it is installed
+try:
+    import pyarrow
+    CSV_ENGINE = 'pyarrow'
+except ImportError:
+    CSV_ENGINE = 'c'
+
+# Axis ticks are the same for every model, so build them once at import
+OVERVIEW_X_TICKS = np.arange(851, 561 - 1, -10)
+CRITICAL_X_TICKS = np.arange(600, 570 - 1, -1)
+Y_TICKS = np.arange(0, 112.5 + 12.5, 12.5)
+
+# Define Colors
+COLOR_BLUE = '#4285F4'
+COLOR_TITLE = '#5F6368'
+COLOR_SUBTITLE = '#9AA0A6'
+COLOR_GRID = '#E0E0E0'
+
 def generate_undervolt_plots(input_csv_path):
     # ==========================================
     # 1. PARSE FILENAME
@@ -26,31 +44,30 @@ def generate_undervolt_plots(input_csv_path):
     # 2. LOAD AND TRANSFORM DATA
     # ==========================================
     print(f"Loading data from {input_csv_path}...")
-    df = pd.read_csv(input_csv_path)
-
-    # Transform units: Voltage -> mV, Accuracy -> %
-    # We check columns to ensure safety
-    if 'voltage' in df.columns and 'accuracy' in df.columns:
-        df['Voltage (mV)'] = df['voltage'] * 1000
-        df['Accuracy (%)'] = df['accuracy'] * 100
-    else:
+    # Only the two plotted columns are loaded, with their types given up front
+    try:
+        df = pd.read_csv(input_csv_path, usecols=['voltage', 'accuracy'],
+                         dtype={'voltage': np.float64, 'accuracy': np.float64}, engine=CSV_ENGINE)
+    except ValueError:
         print("Error: CSV must contain 'voltage' and 'accuracy' columns.")
         return
 
+    # Transform units: Voltage -> mV, Accuracy -> %
+    # The plots only need these two arrays, so they are taken out of the DataFrame here
+    v_mv = df['voltage'].to_numpy() * 1000.0
+    acc_pct = df['accuracy'].to_numpy() * 100.0
+
     # ==========================================
     # PLOTTING HELPER FUNCTION
     # ==========================================
-    def create_single_plot(data, title_text, subtitle_text, x_lims, x_tick_step, output_filename):
-        fig, ax = plt.subplots(figsize=(12, 6), facecolor='white')
-
-        # Define Colors
-        COLOR_BLUE = '#4285F4'
-        COLOR_TITLE = '#5F6368'
-        COLOR_SUBTITLE = '#9AA0A6'
-        COLOR_GRID = '#E0E0E0'
+    def create_single_plot(ax, x_arr, y_arr, title_text, subtitle_text, x_lims, x_ticks, output_filename):
+        # Reuse the shared axes, clearing the previous plot first
+        ax.cla()
 
-        # Scatter Plot
-        ax.scatter(data['Voltage (mV)'], data['Accuracy (%)'], color=COLOR_BLUE, s=50, zorder=3, clip_on=False)
+        # Scatter Plot (drawn as a single marker-only line, markersize is the diameter so sqrt of scatter's area s=50)
+        # Kept out of the tight bounding box like scatter's collection, so off-axis points don't widen the figure
+        ax.plot(x_arr, y_arr, marker='o', linestyle='None', color=COLOR_BLUE, markersize=np.sqrt(50),
+                zorder=3, clip_on=False, in_layout=False)
 
         # Titles (Using extracted model name)
         ax.text(x=0.0, y=1.10, s=title_text, fontsize=20, color=COLOR_TITLE, 
@@ -61,19 +78,12 @@ def generate_undervolt_plots(input_csv_path):
         # X-Axis Configuration
         ax.set_xlabel("Voltage (mV)", labelpad=15, color=COLOR_TITLE)
         ax.set_xlim(x_lims[0], x_lims[1]) 
-        
-        # Calculate ticks
-        start, end = x_lims
-        if start > end: # Decreasing voltage
-            ticks = np.arange(start, end - 1, -x_tick_step)
-        else:
-            ticks = np.arange(start, end + 1, x_tick_step)
-        ax.set_xticks(ticks)
+        ax.set_xticks(x_ticks)
 
         # Y-Axis Configuration
         ax.set_ylabel("Accuracy (%)", labelpad=15, color=COLOR_TITLE)
         ax.set_ylim(0, 118)
-        ax.set_yticks(np.arange(0, 112.5 + 12.5, 12.5))
+        ax.set_yticks(Y_TICKS)
 
         # Grid and Styling
         ax.grid(True, color=COLOR_GRID, linestyle='-', linewidth=1.2, zorder=0)
@@ -87,37 +97,44 @@ def generate_undervolt_plots(input_csv_path):
 
         # Save Plot
         print(f"Saving plot to {output_filename}...")
-        plt.subplots_adjust(top=0.88, bottom=0.15, left=0.08, right=0.95)
-        plt.savefig(output_filename, dpi=150, bbox_inches='tight')
-        plt.close(fig)
+        fig.subplots_adjust(top=0.88, bottom=0.15, left=0.08, right=0.95)
+        fig.savefig(output_filename, dpi=150, bbox_inches='tight')
 
     # ==========================================
     # 3. GENERATE PLOTS
     # ==========================================
     
+    # One figure is created and shared by both plots, as figure setup dominates the plotting time
+    fig, ax = plt.subplots(figsize=(12, 6), facecolor='white')
+
     # Plot 1: Overview
     # Filename format: {ModelName}_Overview.png
     create_single_plot(
-        data=df,
+        ax=ax,
+        x_arr=v_mv,
+        y_arr=acc_pct,
         title_text=model_name,
         subtitle_text="Undervolt Results",
         x_lims=(851, 561),
-        x_tick_step=10,
+        x_ticks=OVERVIEW_X_TICKS,
         output_filename=f"{model_name}_Overview.png"
     )
 
     # Plot 2: Critical Region
     # Filename format: {ModelName}_Critical_Region.png
-    critical_data = df[(df['Voltage (mV)'] <= 600) & (df['Voltage (mV)'] >= 570)]
+    mask = (v_mv <= 600) & (v_mv >= 570)
     
     create_single_plot(
-        data=critical_data,
+        ax=ax,
+        x_arr=v_mv[mask],
+        y_arr=acc_pct[mask],
         title_text=model_name,
         subtitle_text="Undervolt Results (Critical Region)",
         x_lims=(600, 570),
-        x_tick_step=1,
+        x_ticks=CRITICAL_X_TICKS,
         output_filename=f"{model_name}_Critical_Region.png"
     )
+    plt.close(fig)
 
 if __name__ == "__main__":
     # Example usage
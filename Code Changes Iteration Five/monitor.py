@@ -44,6 +44,8 @@ class SystemMonitor:
 
         except KeyboardInterrupt:
             print("\nMonitor Stopped.")
+        finally:
+            self.hal.close()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Universal Board Monitor")
@@ -1,11 +1,15 @@
 import time
 import argparse
 import subprocess
-import threading
+import selectors
 import csv
 import sys
 import re
+import shlex
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+import numpy as np
 from boardAbstraction import BoardHAL
 
 class ExperimentRunner:
@@ -15,18 +19,103 @@ class ExperimentRunner:
         except Exception as e:
             print(f"Failed to initialize HAL: {e}")
             sys.exit(1)
-            
-        self.stop_monitoring = threading.Event()
-        self.log_data = []
 
-    def _monitor_loop(self, rail_name):
-        """ Threaded function to log power during execution """
-        while not self.stop_monitoring.is_set():
+        # Fixed-size circular telemetry buffers, one array per field, written at self._widx % self._cap while
+        # the workload runs. A step longer than the capacity keeps only its most recent samples.
+        self._cap = 4 * 60 * 20 # 20 minutes of samples at 4 Hz
+        self._buf_v = np.empty(self._cap, dtype=np.float64)
+        self._buf_i = np.empty(self._cap, dtype=np.float64)
+        self._buf_p = np.empty(self._cap, dtype=np.float64)
+        self._buf_t = np.empty(self._cap, dtype=np.float64)
+        # PMBus rails log the undecoded (voltage, current) words instead, copied straight from the I2C replies
+        # into a byte buffer and decoded in one batch per step by _step_samples
+        self._raw_buf = bytearray(self._cap * 4)
+        self._raw_words = np.frombuffer(self._raw_buf, dtype='<u2').reshape(self._cap, 2)
+        self._raw_rail = None
+        self._widx = 0
+        self._dropped_samples = 0
+
+        # Per-step CSVs are written by a background thread so disk I/O overlaps the next step
+        self._io_pool = ThreadPoolExecutor(max_workers=1)
+        self._pending = []
+
+    def _sample(self, rail_name):
+        """ Reads one telemetry sample into the step's ring buffer """
+        slot = self._widx % self._cap
+        if self._raw_rail is not None:
+            if not self.hal.read_raw_telemetry_into(rail_name, self._raw_buf, slot * 4):
+                return
+        else:
             data = self.hal.read_telemetry(rail_name)
-            if data:
-                data['timestamp'] = time.time()
-                self.log_data.append(data)
-            time.sleep(0.25)
+            if not data:
+                return
+            self._buf_v[slot] = data['voltage_v']
+            self._buf_i[slot] = data['current_a']
+            self._buf_p[slot] = data['power_w']
+        self._buf_t[slot] = time.time()
+        self._widx += 1
+
+    def _collect_output(self, stream, rail_name=None, end_line=None):
+        """
+        Reads a child's output until EOF (or a line equal to end_line), sampling rail_name at 4 Hz in
+        the same thread while it waits. Returns (True if end_line was seen, last 200 lines of output).
+        """
+        # Samples are phase-locked to a fixed 4 Hz schedule so the read cost doesn't stretch the period
+        period_ns = 250_000_000
+        fd = stream.fileno()
+        tail = deque(maxlen=200)
+        partial = b''
+        found_end = False
+
+        with selectors.DefaultSelector() as sel:
+            sel.register(fd, selectors.EVENT_READ)
+            next_t = time.monotonic_ns()
+            while not found_end:
+                timeout = None
+                if rail_name is not None:
+                    now = time.monotonic_ns()
+                    if now >= next_t:
+                        self._sample(rail_name)
+                        next_t += period_ns
+                        now = time.monotonic_ns()
+                        if now - next_t > period_ns:
+                            # Overran by more than a period (slow read), count the missed slots and restart the schedule
+                            self._dropped_samples += (now - next_t) // period_ns
+                            next_t = now
+                    timeout = max(0, next_t - now) / 1e9
+
+                # Sleep until the child writes something or the next sample is due
+                if not sel.select(timeout):
+                    continue
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    break
+                lines = (partial + chunk).split(b'\n')
+                partial = lines.pop()
+                for line in lines:
+                    if line == end_line:
+                        found_end = True
+                        break
+                    tail.append(line)
+
+        if partial and not found_end:
+            tail.append(partial)
+        return found_end, '\n'.join(line.decode(errors='replace') for line in tail)
+
+    def _step_samples(self):
+        """ Returns the current step's (voltage, current, power, timestamp) arrays in chronological order """
+        n = self._widx
+        if n <= self._cap:
+            idxs = slice(0, n)
+        else:
+            # The buffer has wrapped, the oldest sample is at the write position
+            idxs = np.arange(n - self._cap, n) % self._cap
+
+        if self._raw_rail is not None:
+            words = self._raw_words[idxs]
+            v, i, p = self.hal.decode_raw_telemetry(self._raw_rail, words[:, 0], words[:, 1])
+            return v, i, p, self._buf_t[idxs]
+        return self._buf_v[idxs], self._buf_i[idxs], self._buf_p[idxs], self._buf_t[idxs]
 
     def run_workload_sweep(self, workload_name, steps=25, step_size_v=0.01):
         """
@@ -50,6 +139,8 @@ class ExperimentRunner:
             return
         
         full_cmd = f"{job['executable']} {job['args']}"
+        # Split once and exec directly, no intermediate /bin/sh per run
+        argv = shlex.split(full_cmd)
         cwd = job['cwd']
 
         
@@ -57,13 +148,6 @@ class ExperimentRunner:
         print(f"\n=== Starting Sweep: {workload_name} on {rail} ===")
         print(f"Cmd: {full_cmd}")
 
-        print("Performing Warm-up run to cache model in RAM...")
-        # Run the command once, but don't save the output
-        subprocess.run(full_cmd, shell=True, cwd=cwd, check=False, 
-                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
-        print("Warm-up complete. Starting experiment loop...")
-
         min_v = self.hal.rails[rail]['conf']['limits'].get('min', 0.55)
 
         # Configuration for Increasing datapoints as voltage gets closer to the crash region
@@ -71,9 +155,42 @@ class ExperimentRunner:
         fine_step = 0.001              # The smaller step size
         coarse_step = step_size_v      # Your standard 0.01V step
 
+        # Sample PMBus rails as raw words
+        self._raw_rail = rail if self.hal.has_raw_telemetry(rail) else None
+
+        # Compile the accuracy pattern once for the whole sweep
+        accuracy_re = re.compile(job['regex'])
+
         current_v = nominal_v
         step_count = 0
 
+        # Workloads with an 'interactive_cmd' stay resident for the whole sweep, so the model is only
+        # loaded once and each step just sends a 'run' request
+        worker = None
+        try:
+            if 'interactive_cmd' in job:
+                print(f"Starting resident worker: {job['interactive_cmd']}")
+                worker = subprocess.Popen(shlex.split(job['interactive_cmd']), cwd=cwd, stdin=subprocess.PIPE,
+                                          stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=0)
+
+            print("Performing Warm-up run to cache model in RAM...")
+            # Run the command once, but don't save the output
+            if worker:
+                self._run_worker_step(worker)
+            else:
+                subprocess.run(argv, cwd=cwd, check=False,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+            print("Warm-up complete. Starting experiment loop...")
+
+            # Keep the summary file open for the whole sweep rather than reopening it every step
+            self._open_summary(workload_name)
+        except BaseException:
+            # The sweep's cleanup below isn't armed yet, don't leave the worker running
+            if worker:
+                self._stop_worker(worker)
+            raise
+
         try:
             while current_v >= (min_v - 0.0001):
                 print(f"\n--- Step {step_count}: Setting {current_v:.3f}V ---")
@@ -85,65 +202,69 @@ class ExperimentRunner:
                 
                 time.sleep(1.0)
 
-                # Start monitoring
-                self.stop_monitoring.clear()
-                self.log_data = []
-                monitor_thread = threading.Thread(target=self._monitor_loop, args=(rail,))
-                monitor_thread.start()
+                # Reset the step's telemetry ring, it is filled while waiting on the workload's output
+                self._widx = 0
+                self._dropped_samples = 0
+                # This step's messages, written out in one go once its sampling has finished
+                step_log = []
 
                 # Run model
                 try:
                     start_t = time.time()
-                    result = subprocess.run(full_cmd, shell=True, cwd=cwd, check=False, capture_output=True, text=True)
+                    if worker:
+                        returncode, full_output = self._run_worker_step(worker, rail)
+                    else:
+                        # Merge stderr into stdout just in case the accuracy is hidden in errors, and only keep
+                        # the last 200 lines since the accuracy score is printed at the end of the run
+                        with subprocess.Popen(argv, cwd=cwd, stdout=subprocess.PIPE,
+                                              stderr=subprocess.STDOUT) as proc:
+                            _, full_output = self._collect_output(proc.stdout, rail)
+                            returncode = proc.wait()
                     duration = time.time() - start_t
 
                     # --- DEBUGGING START --- This can be used to figure out the correct regex needed for a model
                     #print("\n--- RAW OUTPUT FROM BOARD ---")
-                    #print(result.stdout)
-                    #print("--- RAW ERRORS FROM BOARD ---")
-                    #print(result.stderr)
+                    #print(full_output)
                     #print("-----------------------------")
                     # --- DEBUGGING END ---
 
-                    # Combine both outputs just in case the accuracy is hidden in errors
-                    full_output = result.stdout + result.stderr
-
-                    # Get Custom Regex
-                    custom_regex = job['regex']
-                    
                     # Run dynamic search for the accuracy score which is dependent on the chosen model
-                    match = re.search(custom_regex, full_output)
+                    match = accuracy_re.search(full_output)
 
                     if match:
                         accuracy_found = float(match.group(1))
                     else:
-                        print(f"WARNING: Could not find accuracy using pattern: {custom_regex}")
+                        step_log.append(f"WARNING: Could not find accuracy using pattern: {accuracy_re.pattern}")
                         accuracy_found = 0.0
                     
                     # Handle Exit Codes (Ignoring -6 for GUI crash)
-                    if result.returncode == 0 or result.returncode == -6:
+                    if returncode == 0 or returncode == -6:
                         status = "SUCCESS"
-                        if result.returncode == -6:
+                        if returncode == -6:
                             status = "SUCCESS (GUI Ignored)"
                         
                         # Print Accuracy nicely
-                        print(f"Result: {status} | Time: {duration:.2f}s | Accuracy: {accuracy_found:.6f}")
+                        step_log.append(f"Result: {status} | Time: {duration:.2f}s | Accuracy: {accuracy_found:.6f}")
                         
                     else:
-                        print(f"Result: CRASH (Exit Code {result.returncode})")
+                        step_log.append(f"Result: CRASH (Exit Code {returncode})")
                     
                 except Exception as e:
-                    print(f"Execution Exception: {e}")
+                    step_log.append(f"Execution Exception: {e}")
                     break
                 
                 finally:
-                    # Stop monitoring
-                    self.stop_monitoring.set()
-                    monitor_thread.join()
-                    for row in self.log_data:
-                        row['accuracy'] = accuracy_found
-                    self._save_csv(workload_name, current_v, self.log_data)
-                    self.update_master_summary(workload_name, current_v, accuracy_found, status, duration)
+                    if self._dropped_samples:
+                        step_log.append(f"WARNING: Monitor fell behind and missed {self._dropped_samples} samples")
+                    # Hand the writer copies, the ring is reused by the next step
+                    v, i, p, t = [np.array(a) for a in self._step_samples()]
+                    self._pending.append(self._io_pool.submit(self._save_csv, workload_name, current_v, accuracy_found, v, i, p, t))
+                    self.update_master_summary(workload_name, current_v, accuracy_found, status, duration, i, p)
+                    step_log.append(f"Summary updated: summary_{workload_name}.csv")
+                    # Report the earlier steps' CSVs the writer has finished with
+                    step_log.extend(self._drain_saved())
+                    sys.stdout.write('\n'.join(step_log) + '\n')
+                    sys.stdout.flush()
 
                 # Check if we are entering the danger zone
                 if current_v <= fine_threshold:
@@ -166,59 +287,94 @@ class ExperimentRunner:
         finally:
             print(f"\n=== Resetting {rail} to Nominal {nominal_v:.3f}V ===")
             self.hal.set_voltage(rail, nominal_v)
+            self._summary_fh.close()
+            saved = self._drain_saved(block=True)
+            if saved:
+                print('\n'.join(saved))
+            if worker:
+                self._stop_worker(worker)
+            # Release the HAL's open sensor descriptors and I2C buses
+            self.hal.close()
 
-    def _save_csv(self, workload, voltage, data):
-        """ Saves statistics of current voltage step to a csv"""
+    def _run_worker_step(self, worker, rail_name=None):
+        """ Asks the resident worker for one run and returns (exit code, last 200 lines of output) """
+        worker.stdin.write(b"run\n")
+        
+        # The worker prints 'END' on its own line once the run is complete
+        finished, output = self._collect_output(worker.stdout, rail_name, end_line=b"END")
+        if finished:
+            return 0, output
+        
+        # Output closed before 'END', the worker has exited
+        return worker.wait(), output
+
+    def _stop_worker(self, worker):
+        """ Closes the worker's input so it can exit, killing it if it doesn't """
+        try:
+            worker.stdin.close()
+            worker.wait(timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            worker.kill()
+            worker.wait()
+
+    def _drain_saved(self, block=False):
+        """ Collects the messages of finished CSV writes in step order, waiting for all of them if block is set """
+        if block:
+            wait(self._pending)
+        messages = []
+        while self._pending and self._pending[0].done():
+            message = self._pending.pop(0).result()
+            if message:
+                messages.append(message)
+        return messages
+
+    def _save_csv(self, workload, voltage, accuracy, v, i, p, t):
+        """
+        Saves statistics of current voltage step to a csv. Runs on the writer thread, so it returns its
+        message for the sweep to print rather than printing over a step that is sampling
+        """
         filename = f"log_{workload}_{voltage:.3f}V.csv"
-        if not data: return
+        if len(t) == 0: return None
         
         try:
-            keys = data[0].keys()
-            with open(filename, 'w', newline='') as f:
-                dict_writer = csv.DictWriter(f, fieldnames=keys)
-                dict_writer.writeheader()
-                dict_writer.writerows(data)
-            print(f"Saved: {filename}")
+            columns = np.column_stack((v, i, p, t, np.full(len(t), accuracy)))
+            # Large write buffer so the whole step goes to disk in a few writes
+            with open(filename, 'wb', buffering=1 << 20) as f:
+                np.savetxt(f, columns, fmt='%.6f', delimiter=',',
+                           header='voltage_v,current_a,power_w,timestamp,accuracy', comments='')
+            return f"Saved: {filename}"
         except IOError as e:
-            print(f"Error saving CSV: {e}")
+            return f"Error saving CSV: {e}"
 
-    def update_master_summary(self, workload, voltage, accuracy, status, duration):
-        """ Updates a master csv file with the current statistics of the voltage step for easier plotting"""
+    def _open_summary(self, workload):
+        """ Opens the master csv file for appending, writing the header if the file is new"""
         filename = f"summary_{workload}.csv"
+        self._summary_fh = open(filename, 'a', newline='')
         
-        # Calculate averages from the detailed log_data collected during this step
-        if self.log_data:
-            # FIX: Look for 'power_w' (from HAL) or fallback to 'power_watts'
-            avg_power = sum(d.get('power_w', d.get('power_watts', 0.0)) for d in self.log_data) / len(self.log_data)
-            
-            # FIX: Look for 'current_a' (from HAL) or fallback to 'current_amps'
-            avg_current = sum(d.get('current_a', d.get('current_amps', 0.0)) for d in self.log_data) / len(self.log_data)
+        # Define columns (These are the Headers for the Excel/CSV file)
+        fieldnames = ['timestamp', 'voltage', 'accuracy', 'status', 'duration', 'avg_power_watts', 'avg_current_amps']
+        self._summary_writer = csv.writer(self._summary_fh)
+        if os.path.getsize(filename) == 0:
+            self._summary_writer.writerow(fieldnames)
+
+    def update_master_summary(self, workload, voltage, accuracy, status, duration, i, p):
+        """ Updates a master csv file with the current statistics of the voltage step for easier plotting"""
+        # Calculate averages from the step's current/power samples (already decoded for the step CSV)
+        if len(p):
+            avg_power = float(p.mean())
+            avg_current = float(i.mean())
         else:
             avg_power = 0.0
             avg_current = 0.0
 
-        # Define columns (These are the Headers for the Excel/CSV file)
-        fieldnames = ['timestamp', 'voltage', 'accuracy', 'status', 'duration', 'avg_power_watts', 'avg_current_amps']
-        
-        row = {
-            'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
-            'voltage': f"{voltage:.4f}",
-            'accuracy': accuracy,
-            'status': status,
-            'duration': f"{duration:.2f}",
-            'avg_power_watts': f"{avg_power:.4f}",  # Matches fieldname
-            'avg_current_amps': f"{avg_current:.4f}" # Matches fieldname
-        }
-
-        # Append to file (Create header if file doesn't exist)
-        file_exists = os.path.isfile(filename)
-        with open(filename, 'a', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow(row)
+        # Values in the same order as the header written by _open_summary
+        row = (time.strftime("%Y-%m-%d %H:%M:%S"), f"{voltage:.4f}", accuracy, status,
+               f"{duration:.2f}", f"{avg_power:.4f}", f"{avg_current:.4f}")
+
+        # Flush each row so the summary survives a board crash mid-sweep
+        self._summary_writer.writerow(row)
+        self._summary_fh.flush()
             
-        print(f"Summary updated: {filename}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -4,12 +4,20 @@ import threading
 import subprocess
 import argparse
 import json 
+import atexit
+from dataclasses import dataclass
+
+# orjson is optional, it parses the config straight from bytes
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
 
 # Load data from json into config
 def load_config(path="zcu102_config.json"):
     try:
-        with open(path) as f:
-            return json.load(f)
+        with open(path, 'rb') as f:
+            return json_loads(f.read())
     except FileNotFoundError:
         print(f"Error: Could not find {path}")
         return None
@@ -18,23 +26,40 @@ config = load_config()
 
 # Setup constants based of JSON data
 BUS_NUMBER = config['board_meta']['i2c_bus_id']
-VCCINT_RAIL = int(config['rails']['VCCINT']['i2c_address'], 16)
-VCCBRAM_RAIL = int(config['rails']['VCCBRAM']['i2c_address'], 16)
+
+@dataclass(frozen=True)
+class RailConsts:
+    # Everything needed to talk to one rail, decoded from the JSON once at import
+    __slots__ = ('addr', 'cmd_sv', 'cmd_rv', 'cmd_ri', 'scale', 'min_v', 'max_v')
+    addr: int
+    cmd_sv: int
+    cmd_rv: int
+    cmd_ri: int
+    scale: float
+    min_v: float
+    max_v: float
+
+def makeRailConsts(rail_name):
+    rail = config['rails'][rail_name]
+    return RailConsts(
+        addr=int(rail['i2c_address'], 16),
+        cmd_sv=int(rail['commands']['vout_cmd'], 16),
+        cmd_rv=int(rail['commands']['read_vout'], 16),
+        cmd_ri=int(rail['commands']['read_iout'], 16),
+        scale=float(rail['format']['scale_factor']),
+        min_v=rail['limits']['min_voltage_v'],
+        max_v=rail['limits']['max_voltage_v'])
+
+VCCINT_RAIL = makeRailConsts('VCCINT')
+VCCBRAM_RAIL = makeRailConsts('VCCBRAM')
 VOLTAGE_RAIL = VCCINT_RAIL # Change this depending on what rail we want to look at, for our experiments we want VCCINT
-READ_VOLTAGE_CMD = int(config['rails']['VCCINT']['commands']['read_vout'], 16)
-READ_CURRENT_CMD = int(config['rails']['VCCINT']['commands']['read_iout'], 16)
-SCALE_FACTOR = config['rails']['format']['scale_factor']
-if VOLTAGE_RAIL == VCCINT_RAIL:
-    DESTINATION_REGISTER = int(config['rails']['VCCINT']['commands']['vout_cmd'], 16)
-    ZCU102_NOM = config['rails']['VCCINT']['limits']['max_voltage_v']
-    LOWER_VOLTAGE_LIMIT = config['rails']['VCCINT']['limits']['min_voltage_v']
-    UPPER_VOLTAGE_LIMIT = config['rails']['VCCINT']['limits']['max_voltage_v']
-else:
-    DESTINATION_REGISTER = int(config['rails']['VCCBRAM']['commands']['vout_cmd'], 16)
-    ZCU102_NOM = config['rails']['VCCBRAM']['limits']['max_voltage_v']
-    LOWER_VOLTAGE_LIMIT = config['rails']['VCCBRAM']['limits']['min_voltage_v']
-    UPPER_VOLTAGE_LIMIT = config['rails']['VCCBRAM']['limits']['max_voltage_v']
-NOMINAL_VOLTAGE = ZCU102_NOM
+NOMINAL_VOLTAGE = VOLTAGE_RAIL.max_v
+
+# Open the I2C bus once and reuse it for every voltage write, released when the script exits
+BUS = smbus2.SMBus(BUS_NUMBER)
+atexit.register(BUS.close)
+# The monitor and workload threads share BUS, hold this around every transaction so PMBus commands can't interleave
+BUS_LOCK = threading.Lock()
 
 # This is to pass the argument to switch between power advantage and UART
 parser = argparse.ArgumentParser(description='PA or UART')
@@ -56,34 +81,34 @@ stop_event = threading.Event()
 def readData(bus, device_address, location):
     try:
         # Read the data from the device
-        data = bus.read_word_data(device_address, location)
+        with BUS_LOCK:
+            data = bus.read_word_data(device_address, location)
         return data
     except OSError as e:
         print(f"Error reading from device at address {hex(device_address)}: {e}")
         return None
 
 def readLoop(bus, location):
-        alt = readData(bus, VOLTAGE_RAIL, location)
+        alt = readData(bus, VOLTAGE_RAIL.addr, location)
         if alt is not None:
-            print(f"{location}: {hex(alt)} || {alt} Value: {alt/SCALE_FACTOR}V")
+            print(f"{location}: {hex(alt)} || {alt} Value: {alt/VOLTAGE_RAIL.scale}V")
 
-def readAll(bus, voltageLocation, currentLocation):
-    alt = readData(bus, VOLTAGE_RAIL, voltageLocation)
-    alt2 = readData(bus, VOLTAGE_RAIL, currentLocation)
+def readAll(bus, rc):
+    alt = readData(bus, rc.addr, rc.cmd_rv)
+    alt2 = readData(bus, rc.addr, rc.cmd_ri)
     if alt is not None and alt2 is not None:
-        print(f"Power: {alt/SCALE_FACTOR:.2f}V x {alt2/SCALE_FACTOR:.2f}A = {(alt/SCALE_FACTOR)*(alt2/SCALE_FACTOR):.2f}W")
-        # print(f"Power: {alt/SCALE_FACTOR:.2f}V ({alt}) x {alt2/SCALE_FACTOR:.2f}A ({alt2})= {(alt/SCALE_FACTOR)*(alt2/SCALE_FACTOR):.2f}W") # debug
+        print(f"Power: {alt/rc.scale:.2f}V x {alt2/rc.scale:.2f}A = {(alt/rc.scale)*(alt2/rc.scale):.2f}W")
+        # print(f"Power: {alt/rc.scale:.2f}V ({alt}) x {alt2/rc.scale:.2f}A ({alt2})= {(alt/rc.scale)*(alt2/rc.scale):.2f}W") # debug
 
 
-def getReadingsBus(busNumber, safe = True):
+def getReadingsBus(bus, safe = True):
     # safe = True means that we are threading and safe = False means we are not
-    bus = smbus2.SMBus(busNumber)
     if not safe:
-        readAll(bus, READ_VOLTAGE_CMD, READ_CURRENT_CMD)
+        readAll(bus, VOLTAGE_RAIL)
         return # we want to get out of here
     try:
         while not stop_event.is_set() and safe:
-            readAll(bus, READ_VOLTAGE_CMD, READ_CURRENT_CMD)
+            readAll(bus, VOLTAGE_RAIL)
             time.sleep(0.25)
     except KeyboardInterrupt:
         stop_event.set()
@@ -100,10 +125,10 @@ def undervoltingLoop(initialvoltage, cwd, cmd, iter, step):
         print("==============================")
         print(f"Voltage: {volt:.2f}")
         print("==============================")
-        setVoltage(smbus2.SMBus(BUS_NUMBER), VOLTAGE_RAIL, DESTINATION_REGISTER, volt) #COMMENT OUT IF DONT WANT TO UNDERVOLT
+        setVoltage(BUS, VOLTAGE_RAIL, volt) #COMMENT OUT IF DONT WANT TO UNDERVOLT
         runCommand(cmd, cwd)
         volt -= step
-    setVoltage(smbus2.SMBus(BUS_NUMBER), VOLTAGE_RAIL, DESTINATION_REGISTER, NOMINAL_VOLTAGE) # reset back to normal
+    setVoltage(BUS, VOLTAGE_RAIL, NOMINAL_VOLTAGE) # reset back to normal
     stop()
 
 def runCompendium():
@@ -112,11 +137,11 @@ def runCompendium():
     f=open("compendium.txt","r")
     for v in f:
         # for each line in the file read and set the voltage to it
-        setVoltage(smbus2.SMBus(BUS_NUMBER), VOLTAGE_RAIL, DESTINATION_REGISTER, float(v.strip()))  # reset back to normal
+        setVoltage(BUS, VOLTAGE_RAIL, float(v.strip()))  # reset back to normal
         time.sleep(0.5) # change as needed
     f.close()
 
-    setVoltage(smbus2.SMBus(BUS_NUMBER), VOLTAGE_RAIL, DESTINATION_REGISTER, NOMINAL_VOLTAGE) # reset back to normal
+    setVoltage(BUS, VOLTAGE_RAIL, NOMINAL_VOLTAGE) # reset back to normal
     stop()
 
 def runWorkload(model_name):
@@ -144,27 +169,18 @@ def runWorkload(model_name):
     start_voltage = job.get('nominal_voltage', NOMINAL_VOLTAGE)
     undervoltingLoop(start_voltage, cwd=cwd, cmd=cmd, iter=NUM_STEPS, step=STEP_SIZE)
 
-def setVoltage(bus, address, destination, voltageDecimal):
+def setVoltage(bus, rc, voltageDecimal):
     # This needs to be converted to a value and written into hex, the conversion is dependent on the mode of the board from JSON
-    if voltageDecimal < LOWER_VOLTAGE_LIMIT or voltageDecimal > UPPER_VOLTAGE_LIMIT: # out of bounds
-        raise Exception(f"Voltage must be between {LOWER_VOLTAGE_LIMIT} and {UPPER_VOLTAGE_LIMIT}, entered voltage: {voltageDecimal}")
+    if voltageDecimal < rc.min_v or voltageDecimal > rc.max_v: # out of bounds
+        raise Exception(f"Voltage must be between {rc.min_v} and {rc.max_v}, entered voltage: {voltageDecimal}")
     try:
-        bus.write_word_data(address, destination, (int(voltageDecimal*SCALE_FACTOR)))
+        with BUS_LOCK:
+            bus.write_word_data(rc.addr, rc.cmd_sv, (int(voltageDecimal*rc.scale)))
         return True
     except OSError as e:
-        print(f"Error writing to device at address {hex(address)}: {e}")
+        print(f"Error writing to device at address {hex(rc.addr)}: {e}")
         return False
 
-def selectedModel(model_name, threaded=False):
-    # Simplified method of calling models depending on whether it was a threaded call or not
-    def task():
-        runWorkload(model_name)
-
-    if threaded:
-        return task # Lets the Thread call the function instead 
-    else:
-        task() # Run it immediately if not threaded
-
 def main():
     # Get models from JSON 
     available_models = list(config['workloads'].keys())
@@ -194,12 +210,12 @@ def main():
     print(f"=== Using Model: {model} ===")
     print("==============================")
     
-    setVoltage(smbus2.SMBus(BUS_NUMBER), VOLTAGE_RAIL, DESTINATION_REGISTER, NOMINAL_VOLTAGE)
+    setVoltage(BUS, VOLTAGE_RAIL, NOMINAL_VOLTAGE)
     
     if isThreaded:
         # shellThread = threading.Thread(target=runCommand, args=(shellCommand,directory,))
-        monitorThread = threading.Thread(target=getReadingsBus, args=(BUS_NUMBER, True,), daemon=True)
-        shellThread = threading.Thread(target=selectedModel(model, threaded=True), daemon=True)
+        monitorThread = threading.Thread(target=getReadingsBus, args=(BUS, True,), daemon=True)
+        shellThread = threading.Thread(target=runWorkload, args=(model,), daemon=True)
         print("Threads started")
         monitorThread.start()
         shellThread.start()
@@ -211,11 +227,11 @@ def main():
         except KeyboardInterrupt:
             print("Shutting down")
             # end all other processes
-            setVoltage(smbus2.SMBus(BUS_NUMBER), VOLTAGE_RAIL, DESTINATION_REGISTER, NOMINAL_VOLTAGE)  # reset back to normal
+            setVoltage(BUS, VOLTAGE_RAIL, NOMINAL_VOLTAGE)  # reset back to normal
             exit(1)
     else: # not threaded
         print("Running the selected model")
-        selectedModel(model)
+        runWorkload(model)
 
     print("==============================")
     print("==========Finished============")
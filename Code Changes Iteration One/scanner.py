@@ -73,47 +73,32 @@ def get_hwmon_path(sensor_name_key):
             return hwmon
     return None
 
-def print_sensor_values(hwmon):
-    if not hwmon:
-        return
+def open_sensor(hwmon, pattern):
+    # Opens the first sysfs attribute matching the pattern once, so each tick is a single pread
+    files = glob.glob(os.path.join(hwmon, pattern))
+    if not files:
+        return None
+    try:
+        return os.open(files[0], os.O_RDONLY)
+    except OSError:
+        return None
 
-    name = read_file(os.path.join(hwmon, "name"))
-    rail_name = lookup.get(name, "Unknown Rail")
-
-    # print(f"=== {rail_name} ({name}) ===") 
-
-    # We specifically want Voltage and Power
-    in_file = glob.glob(os.path.join(hwmon, "in*_input"))
-    power_file = glob.glob(os.path.join(hwmon, "power*_input"))
-    curr_file = glob.glob(os.path.join(hwmon, "curr*_input"))
-
-    # Read Voltage (mV)
-    volts = 0
-    v_path = os.path.join(hwmon, "in1_input")
-    if os.path.exists(v_path):
-        val = read_file(v_path)
-    else:
-        # Fallback to whatever input is available
-        files = glob.glob(os.path.join(hwmon, "in*_input"))
-        val = read_file(files[0]) if files else None
-    if in_file:
-        val = read_file(in_file[0])
-        if val: 
-            volts = int(val)
-
-    # Read Power (uW)
-    power = 0
-    if power_file:
-        val = read_file(power_file[0])
-        if val:
-            power = int(val)
-            
-    # Read Current (mA)
-    current = 0
-    if curr_file:
-        val = read_file(curr_file[0])
-        if val:
-            current = int(val)
+def read_sensor(fd):
+    if fd is None:
+        return 0
+    try:
+        # Parse the bytes up to the newline directly, no str decode/strip
+        buf = os.pread(fd, 24, 0)
+        end = buf.find(b'\n')
+        return int(buf[:end] if end >= 0 else buf)
+    except (OSError, ValueError):
+        return 0
+
+def print_sensor_values(rail_name, fd_v, fd_p, fd_c):
+    # Voltage (mV), Power (uW), Current (mA)
+    volts = read_sensor(fd_v)
+    power = read_sensor(fd_p)
+    current = read_sensor(fd_c)
 
     # Print in a nice single line format: "VCCINT: 850mV | 15000uW"
     print(f"{rail_name:<15} : {volts} mV | {current} mA | {power} uW")
@@ -140,12 +125,22 @@ def main():
             print(f" - {read_file(os.path.join(h, 'name'))}")
         return
 
+    # Resolve the rail name and sensor files once rather than every tick
+    rail_name = lookup.get(read_file(os.path.join(hwmon_path, "name")), "Unknown Rail")
+    fd_v = open_sensor(hwmon_path, "in*_input")
+    fd_p = open_sensor(hwmon_path, "power*_input")
+    fd_c = open_sensor(hwmon_path, "curr*_input")
+
     try:
         while True:
-            print_sensor_values(hwmon_path)
+            print_sensor_values(rail_name, fd_v, fd_p, fd_c)
             time.sleep(0.5) # Update every half second
     except KeyboardInterrupt:
         print("\nStopping monitor.")
+    finally:
+        for fd in (fd_v, fd_p, fd_c):
+            if fd is not None:
+                os.close(fd)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,7 +1,49 @@
 import smbus2
 import json
 import os
-import glob
+import errno
+import struct
+import atexit
+from collections import namedtuple
+
+# PMBus PAGE command, selects which output of a multi-rail regulator later commands apply to
+PMBUS_PAGE = 0x00
+# Command byte followed by a little-endian word, the layout of a PMBus word write (e.g. VOUT_COMMAND)
+_CMD_WORD = struct.Struct('<BH')
+
+# Default telemetry poll period (s), slower sensors stretch it to their hwmon update_interval
+POLL_PERIOD_S = 0.5
+
+# Open I2C buses by bus id, shared by every BoardHAL in the process so re-creating one (e.g. from a
+# notebook) doesn't reopen /dev/i2c-N. The PAGE selected on each regulator is a property of the bus too
+_BUS_CACHE = {}
+_PAGE_CACHE = {}
+
+def _close_buses():
+    for bus in _BUS_CACHE.values():
+        bus.close()
+    _BUS_CACHE.clear()
+    _PAGE_CACHE.clear()
+
+atexit.register(_close_buses)
+
+# One telemetry reading, a plain tuple underneath so the sampler can unpack it straight into its columns
+Sample = namedtuple('Sample', ('voltage_v', 'current_a', 'power_w'))
+
+class RailInfo:
+    """
+    Control parameters of one rail, parsed from the JSON once at startup.
+    """
+    __slots__ = ('addr', 'cmd', 'page', 'scale', 'min_v', 'max_v', 'has_i2c')
+
+    def __init__(self, addr=0, cmd=0, page=None, scale=4096, min_v=0.0, max_v=1.0, has_i2c=False):
+        self.addr = addr
+        self.cmd = cmd
+        self.page = page
+        self.scale = scale
+        self.min_v = min_v
+        self.max_v = max_v
+        self.has_i2c = has_i2c
 
 class BoardHAL:
     def __init__(self, config_path):
@@ -18,24 +60,38 @@ class BoardHAL:
 
         # Initialize I2C Bus for Voltage Control
         self.bus_id = self.config['board_meta'].get('i2c_bus_id', 4)
-        try:
-            self.bus = smbus2.SMBus(self.bus_id)
-            # Check if bus is acessible
-            print(f"[HAL] Connected to I2C Bus {self.bus_id}")
-        except Exception as e:
-            print(f"[HAL] WARNING: Could not open I2C Bus {self.bus_id}. Voltage control will fail. {e}")
-            self.bus = None
-
-        # 2. Map SysFS Paths for Monitoring
+        self.bus = _BUS_CACHE.get(self.bus_id)
+        if self.bus is None:
+            try:
+                self.bus = _BUS_CACHE[self.bus_id] = smbus2.SMBus(self.bus_id)
+                # Check if bus is acessible
+                print(f"[HAL] Connected to I2C Bus {self.bus_id}")
+            except Exception as e:
+                print(f"[HAL] WARNING: Could not open I2C Bus {self.bus_id}. Voltage control will fail. {e}")
+
+        # PAGE last selected on each regulator address, so repeated writes to the same page skip it
+        self._last_page = _PAGE_CACHE.setdefault(self.bus_id, {})
+
+        # 2. Map SysFS Paths for Monitoring (also fills the per-rail control cache and poll periods)
+        self._rail_cache = {}
+        self.poll_periods = {}
+        self._skip_power = {}
         self.monitor_paths = self._discover_sensors()
 
+        # 3. Open each rail's sensor files once, read_telemetry re-reads them with os.pread
+        self._fd_cache = self._open_sensor_files()
+
     def _discover_sensors(self):
         """
         Scans Linux /sys/class/hwmon to find the drivers matching the JSON config.
         """
         mapping = {}
         # Get all hwmon directories
-        directory = glob.glob("/sys/class/hwmon/hwmon*")
+        try:
+            with os.scandir("/sys/class/hwmon") as it:
+                directory = [e.path for e in it if e.name.startswith('hwmon')]
+        except OSError:
+            directory = []
         
         # Pre-load all driver names to avoid opening files repeatedly
         system_sensors = {}
@@ -53,8 +109,14 @@ class BoardHAL:
             mon_config = rail_data.get('monitoring', {})
             search_str = mon_config.get('driver_name_match', '')
             fallback = mon_config.get('fallback_sysfs_path')
+            # INA226-class sensors compute power as bus voltage * current themselves, so the power file
+            # can be skipped and the power calculated from the two readings already taken
+            self._skip_power[rail_name] = mon_config.get('skip_power_file', False)
             
             found = False
+
+            # Pre-parse the control parameters so set_voltage doesn't re-read the JSON
+            self._rail_cache[rail_name] = self._parse_rail(rail_name, rail_data)
             
             # Match by Driver Name (e.g. "ina226_u79")
             if search_str:
@@ -71,7 +133,7 @@ class BoardHAL:
                 found = True
             
             if found:
-                pass
+                self.poll_periods[rail_name] = self._read_poll_period(mapping[rail_name])
             else:
                 # Only warn if missing address that JSON has
                 if 'i2c_address' in rail_data:
@@ -79,92 +141,225 @@ class BoardHAL:
 
         return mapping
 
-    def set_voltage(self, rail_name, voltage_v):
+    @staticmethod
+    def _read_poll_period(path):
         """
-        Sets the voltage for a specific rail via I2C.
+        Poll period for a sensor, its hwmon update_interval (ms) if that is longer than the default.
+        """
+        try:
+            with open(os.path.join(path, 'update_interval'), 'r') as f:
+                return max(POLL_PERIOD_S, int(f.read()) / 1000.0)
+        except (IOError, ValueError):
+            return POLL_PERIOD_S
+
+    def _parse_rail(self, rail_name, rail_data):
+        """
+        Builds the RailInfo for a rail, rails without an I2C address (or with bad hex values) can't be controlled.
+        """
+        if 'i2c_address' not in rail_data:
+            return RailInfo()
+
+        limits = rail_data.get('limits', {})
+        fmt = rail_data.get('format', {})
+        commands = rail_data.get('commands', {})
+        try:
+            # Optional PMBus page, only needed when the regulator drives more than one rail.
+            # An integer index (e.g. 1), as Iteration Five's connection.page, or a hex string (e.g. "0x01")
+            page = commands.get('page')
+            if isinstance(page, str):
+                page = int(page, 16)
+            if page is not None and not (isinstance(page, int) and 0 <= page <= 0xFF):
+                raise ValueError(page)
+            return RailInfo(addr=int(rail_data['i2c_address'], 16),
+                            cmd=int(commands.get('vout_cmd', '0x21'), 16),
+                            page=page,
+                            scale=fmt.get('scale_factor', 4096),
+                            min_v=limits.get('min_voltage_v', 0.0),
+                            max_v=limits.get('max_voltage_v', 1.0), # Default safe max
+                            has_i2c=True)
+        except (ValueError, TypeError):
+            print(f"[HAL] Config Error: Invalid hex string for address/command/page on {rail_name}")
+            return RailInfo()
+
+    def _open_sensor_files(self):
+        """
+        Resolves the voltage/current/power input files of every discovered rail and keeps them open.
+        Returns dict: {rail_name: {'v': fd, 'c': fd, 'p': fd}} (None where a file doesn't exist)
+        """
+        fd_cache = {}
+        for rail_name, path in self.monitor_paths.items():
+            # One directory pass, sorting the *_input attributes by kind
+            found = {'v': {}, 'c': {}, 'p': {}}
+            try:
+                with os.scandir(path) as it:
+                    for e in it:
+                        name = e.name
+                        if not name.endswith('_input'):
+                            continue
+                        if name.startswith('in'):
+                            found['v'][name] = e.path
+                        elif name.startswith('curr'):
+                            found['c'][name] = e.path
+                        elif name.startswith('power') and not self._skip_power.get(rail_name):
+                            found['p'][name] = e.path
+            except OSError as e:
+                print(f"[HAL] WARNING: Could not list {path} for {rail_name}: {e}")
+
+            # Directory order is arbitrary, so pick deterministically: the lowest channel, except for
+            # voltage where INA226-class drivers put the shunt voltage on in0 and the bus voltage on in1.
+            # A rail can name its voltage file explicitly with monitoring.voltage_file
+            mon_config = self.config['rails'][rail_name].get('monitoring', {})
+            files = {}
+            for key, candidates in found.items():
+                if not candidates:
+                    continue
+                if key == 'v':
+                    for preferred in (mon_config.get('voltage_file'), 'in1_input'):
+                        if preferred in candidates:
+                            files[key] = candidates[preferred]
+                            break
+                if key not in files:
+                    files[key] = candidates[min(candidates, key=self._channel)]
+
+            fds = {'v': None, 'c': None, 'p': None}
+            for key, file_path in files.items():
+                try:
+                    fds[key] = os.open(file_path, os.O_RDONLY)
+                except OSError as e:
+                    print(f"[HAL] WARNING: Could not open {file_path} for {rail_name}: {e}")
+            fd_cache[rail_name] = fds
+        return fd_cache
+
+    @staticmethod
+    def _channel(name):
+        """ Channel number of a hwmon attribute name, e.g. 1 for 'curr1_input' """
+        digits = ''.join(ch for ch in name if ch.isdigit())
+        return int(digits) if digits else 0
+
+    def close(self):
+        """
+        Closes the cached sensor file descriptors. The I2C bus is shared and stays open until exit.
+        """
+        for fds in self._fd_cache.values():
+            for fd in fds.values():
+                if fd is not None:
+                    os.close(fd)
+        self._fd_cache = {}
+
+    @staticmethod
+    def _read_fd(fd):
+        """
+        Reads an integer sysfs attribute from offset 0, retrying once if the driver had no value ready.
+        """
+        try:
+            return int(os.pread(fd, 32, 0))
+        except OSError as e:
+            if e.errno not in (errno.ENODATA, errno.EAGAIN):
+                raise
+            return int(os.pread(fd, 32, 0))
+
+    def _vout_msg(self, rail_name, voltage_v):
+        """
+        Safety checks a voltage for a rail and builds its VOUT_COMMAND write.
+        Returns None (after printing why) if the voltage can't be set.
         """
         # Safety checks
         if not self.bus:
             print("[HAL] Error: I2C Bus not initialized.")
-            return False
-        if rail_name not in self.config['rails']:
+            return None
+        ri = self._rail_cache.get(rail_name)
+        if ri is None:
             print(f"[HAL] Error: Rail '{rail_name}' not defined in config.")
-            return False
-
-        rail = self.config['rails'][rail_name]
+            return None
         
         # Check if this rail actually supports control
-        if 'i2c_address' not in rail:
+        if not ri.has_i2c:
             print(f"[HAL] Error: Rail '{rail_name}' is monitoring-only (no I2C address).")
-            return False
+            return None
 
         # Voltage limits
-        limits = rail.get('limits', {})
-        min_v = limits.get('min_voltage_v', 0.0)
-        max_v = limits.get('max_voltage_v', 1.0) # Default safe max
+        if not (ri.min_v <= voltage_v <= ri.max_v):
+            print(f"[HAL] SAFETY TRIP: {voltage_v}V is outside allowed range ({ri.min_v}-{ri.max_v}V) for {rail_name}")
+            return None
 
-        if not (min_v <= voltage_v <= max_v):
-            print(f"[HAL] SAFETY TRIP: {voltage_v}V is outside allowed range ({min_v}-{max_v}V) for {rail_name}")
-            return False
+        # VOUT_COMMAND is a little-endian word
+        try:
+            return smbus2.i2c_msg.write(ri.addr, _CMD_WORD.pack(ri.cmd, int(voltage_v * ri.scale)))
+        except struct.error as e:
+            print(f"[HAL] Config Error: {voltage_v}V doesn't fit a VOUT word on {rail_name}: {e}")
+            return None
 
-        # Calculate register value
-        fmt = rail.get('format', {})
-        scale = fmt.get('scale_factor', 4096)
-        raw_val = int(voltage_v * scale)
-        
-        # Write new voltage
+    def write_planned_voltage(self, rail_name, msg):
+        """
+        Sends a VOUT_COMMAND write built by plan_voltages (or set_voltage). If the rail needs a different
+        PAGE than the one last selected on its regulator, both go out in one combined transaction.
+        """
+        ri = self._rail_cache[rail_name]
+        msgs = [msg]
+        if ri.page is not None and self._last_page.get(ri.addr) != ri.page:
+            msgs.insert(0, smbus2.i2c_msg.write(ri.addr, [PMBUS_PAGE, ri.page]))
         try:
-            addr = int(rail['i2c_address'], 16)
-            cmd_str = rail.get('commands', {}).get('vout_cmd', '0x21')
-            cmd = int(cmd_str, 16)
-            
-            self.bus.write_word_data(addr, cmd, raw_val)
+            self.bus.i2c_rdwr(*msgs)
+            if ri.page is not None:
+                self._last_page[ri.addr] = ri.page
             return True
-        except ValueError:
-            print(f"[HAL] Config Error: Invalid hex string for address/command on {rail_name}")
-            return False
         except IOError as e:
+            # The regulator's page is unknown after a failed transfer, re-send it next time
+            self._last_page.pop(ri.addr, None)
             print(f"[HAL] I2C Write Failed on {rail_name}: {e}")
             return False
 
+    def plan_voltages(self, rail_name, voltages):
+        """
+        Checks and builds the VOUT_COMMAND writes for a whole sweep up front, so each step is one transfer.
+        Stops at the first voltage that can't be set, returning the writes for the ones before it.
+        """
+        plan = []
+        for voltage_v in voltages:
+            msg = self._vout_msg(rail_name, voltage_v)
+            if msg is None:
+                break
+            plan.append(msg)
+        return plan
+
+    def set_voltage(self, rail_name, voltage_v):
+        """
+        Sets the voltage for a specific rail via I2C.
+        """
+        msg = self._vout_msg(rail_name, voltage_v)
+        if msg is None:
+            return False
+        return self.write_planned_voltage(rail_name, msg)
+
     def read_telemetry(self, rail_name):
         """
         Reads voltage/current from SysFS (Monitoring).
-        Returns dict: {'voltage_v': float, 'current_a': float, 'power_w': float}
+        Returns Sample: (voltage_v, current_a, power_w)
+        Returns None if the read failed.
         """
-        if rail_name not in self.monitor_paths:
+        fds = self._fd_cache.get(rail_name)
+        if fds is None:
             return None
-        
-        path = self.monitor_paths[rail_name]
+
+        fd_v, fd_c, fd_p = fds['v'], fds['c'], fds['p']
         try:
-            mv = 0.0
-            ma = 0.0
-            
-            # Find Voltage File
-            in_files = glob.glob(os.path.join(path, "in*_input"))
-            if in_files:
-                with open(in_files[0], 'r') as f:
-                    mv = float(f.read())
-
-            # Find Current File
-            curr_files = glob.glob(os.path.join(path, "curr*_input"))
-            if curr_files:
-                with open(curr_files[0], 'r') as f:
-                    ma = float(f.read())
-            
-            # Calculate Power (if power*_input file exists, use it, otherwise calc)
-            pwr_files = glob.glob(os.path.join(path, "power*_input"))
-            if pwr_files:
-                 with open(pwr_files[0], 'r') as f:
-                    uw = float(f.read())
-                    power_w = uw / 1e6
+            mv = 0
+            ma = 0
+
+            # Voltage
+            if fd_v is not None:
+                mv = self._read_fd(fd_v)
+
+            # Current
+            if fd_c is not None:
+                ma = self._read_fd(fd_c)
+
+            # Power (if power*_input file exists, use it, otherwise calc)
+            if fd_p is not None:
+                power_w = self._read_fd(fd_p) / 1e6
             else:
                 power_w = (mv * ma) / 1e6
 
-            return {
-                "voltage_v": mv / 1000.0,
-                "current_a": ma / 1000.0,
-                "power_w": power_w
-            }
+            return Sample(mv / 1000.0, ma / 1000.0, power_w)
         except Exception:
-            return None
\ No newline at end of file
+            return None
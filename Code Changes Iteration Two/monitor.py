@@ -24,7 +24,7 @@ class SystemMonitor:
                 if target_rail:
                     data = self.hal.read_telemetry(target_rail)
                     if data:
-                        print(f"{target_rail:<15} : {data['voltage_v']:<6.3f} V    | {data['current_a']:<6.3f} mA    | {data['power_w']:<6.3f} mW")
+                        print(f"{target_rail:<15} : {data.voltage_v:<6.3f} V    | {data.current_a:<6.3f} mA    | {data.power_w:<6.3f} mW")
                     else:
                         print(f"Rail '{target_rail}' not found or sensor unavailable.")
                         break
@@ -35,7 +35,7 @@ class SystemMonitor:
                     for rail in self.hal.config['rails']:
                         data = self.hal.read_telemetry(rail)
                         if data:
-                             print(f"{rail:<15} : {data['voltage_v']:<6.3f} V    | {data['current_a']:<6.3f} A    | {data['power_w']:<6.3f} W")
+                             print(f"{rail:<15} : {data.voltage_v:<6.3f} V    | {data.current_a:<6.3f} A    | {data.power_w:<6.3f} W")
                     print("") # Space between blocks
                 
                 # Update speed
@@ -1,10 +1,19 @@
 import time
 import argparse
 import subprocess
-import threading
-import csv
+import select
 import sys
-from boardAbstraction import BoardHAL
+import os
+import shlex
+import queue
+import threading
+import tempfile
+import numpy as np
+from boardAbstraction import BoardHAL, POLL_PERIOD_S
+
+# Step CSV layout, one format string for a whole row
+CSV_HEADER = 'voltage_v,current_a,power_w,timestamp_ns\n'
+CSV_ROW = '%.6f,%.6f,%.6f,%d\n'
 
 class ExperimentRunner:
     def __init__(self, config_file):
@@ -13,18 +22,187 @@ class ExperimentRunner:
         except Exception as e:
             print(f"Failed to initialize HAL: {e}")
             sys.exit(1)
-            
-        self.stop_monitoring = threading.Event()
-        self.log_data = []
-
-    def _monitor_loop(self, rail_name):
-        """ Threaded function to log power during execution """
-        while not self.stop_monitoring.is_set():
-            data = self.hal.read_telemetry(rail_name)
-            if data:
-                data['timestamp'] = time.time()
-                self.log_data.append(data)
-            time.sleep(0.5) 
+
+        # Fixed-size telemetry buffer, one array per column. When it fills up the samples are
+        # appended to the current step's CSV and writing starts again from slot 0
+        self._N = 1024
+        self._ts = np.empty(self._N, dtype='i8')  # time.monotonic_ns()
+        self._v = np.empty(self._N, dtype='f4')
+        self._i = np.empty(self._N, dtype='f4')
+        self._p = np.empty(self._N, dtype='f4')
+        self._head = 0
+
+        # CSV for the step being sampled and how many rows it holds so far
+        self._csv_file = None
+        self._csv_rows = 0
+
+        # Optional CPU pinning from the board config, the sampler gets its own core so the workload
+        # doesn't perturb the sample cadence (and the sampler doesn't perturb the workload's timing)
+        meta = self.hal.config.get('board_meta', {})
+        self._monitor_core = meta.get('monitor_core')
+        self._workload_cores = set(meta.get('workload_cores', ()))
+        if not hasattr(os, 'sched_setaffinity'):
+            self._monitor_core, self._workload_cores = None, set()
+        # The affinity the process started with, restored for whichever half of the pinning is off
+        self._orig_cpus = os.sched_getaffinity(0) if hasattr(os, 'sched_getaffinity') else None
+
+        # Finished sample blocks are written out by a background thread so the sweep doesn't wait on disk
+        self._csv_q = queue.Queue(maxsize=8)
+        self._writer = None
+        # The writer's "Saved"/"Error" messages, printed by the sweep so they never land mid-step
+        self._csv_results = queue.Queue()
+
+    def _sample(self, rail_name):
+        """ Logs one telemetry sample """
+        sample = self.hal.read_telemetry(rail_name)
+        if sample:
+            h = self._head
+            self._ts[h] = time.monotonic_ns()
+            self._v[h], self._i[h], self._p[h] = sample
+            self._head = h + 1
+            if self._head == self._N:
+                self._flush_samples()
+
+    def _pin(self, cpus):
+        """ Pins the calling thread to cpus, disabling pinning if the board doesn't have them """
+        try:
+            os.sched_setaffinity(0, cpus)
+        except OSError as e:
+            print(f"Warning: could not pin to CPUs {sorted(cpus)}, running unpinned: {e}")
+            self._monitor_core, self._workload_cores = None, set()
+            self._unpin()
+
+    def _unpin(self):
+        """ Puts the calling thread back on the CPUs the process started with """
+        if self._orig_cpus is not None:
+            os.sched_setaffinity(0, self._orig_cpus)
+
+    def _spawn(self, argv, cwd, stderr):
+        """
+        Starts the workload. A child inherits the affinity of the thread that forks it, so this thread
+        switches to the workload cores for the fork and back afterwards, to the monitor core or, without
+        one, to the CPUs it started with.
+        """
+        pinned = bool(self._workload_cores)
+        if pinned:
+            self._pin(self._workload_cores)
+        try:
+            return subprocess.Popen(argv, cwd=cwd, stdout=subprocess.DEVNULL, stderr=stderr)
+        finally:
+            if self._monitor_core is not None:
+                self._pin({self._monitor_core})
+            elif pinned:
+                self._unpin()
+
+    def _start_step_log(self, workload, voltage):
+        """ Points the telemetry buffer at a new step's CSV """
+        self._csv_file = f"log_{workload}_{voltage:.3f}V.csv"
+        self._csv_rows = 0
+        self._head = 0
+
+    def _flush_samples(self, last=False):
+        """
+        Appends the buffered samples to the step's CSV and empties the buffer. last marks the step's
+        final block, after which the writer reports whether the whole CSV was saved
+        """
+        n = self._head
+        if not n:
+            if last and self._csv_rows:
+                self._csv_q.put((self._csv_file, None, False, True))
+            return
+        self._head = 0
+
+        # fromarrays copies, so the buffer can be refilled while the writer thread saves this block.
+        # A record array keeps the timestamps as exact integers, column_stack would turn them into floats
+        columns = np.rec.fromarrays((self._v[:n], self._i[:n], self._p[:n], self._ts[:n]))
+        self._csv_q.put((self._csv_file, columns, self._csv_rows == 0, last))
+        self._csv_rows += n
+
+    def _csv_writer(self):
+        """
+        Writer thread, saves queued sample blocks until it gets the None sentinel. Results go to
+        _csv_results, one error per failed block and "Saved" once a step's CSV was written in full
+        """
+        failed = set()
+        while True:
+            item = self._csv_q.get()
+            if item is None:
+                return
+            filename, columns, first, last = item
+            if columns is not None:
+                # Same text np.savetxt would produce, but tolist() hands over plain Python rows so each
+                # one is a single % format instead of a numpy row conversion per line
+                text = ''.join([CSV_ROW % row for row in columns.tolist()])
+                try:
+                    with open(filename, 'w' if first else 'a') as f:
+                        if first:
+                            f.write(CSV_HEADER)
+                        f.write(text)
+                except IOError as e:
+                    failed.add(filename)
+                    self._csv_results.put(f"Error saving CSV {filename}: {e}")
+            if last:
+                if filename in failed:
+                    failed.discard(filename)
+                else:
+                    self._csv_results.put(f"Saved data to {filename}")
+
+    def _report_saved(self):
+        """ Prints the results the writer has posted so far """
+        while True:
+            try:
+                print(self._csv_results.get_nowait())
+            except queue.Empty:
+                return
+
+    @staticmethod
+    def _open_pidfd(proc):
+        """ fd that becomes readable when proc exits, None if the kernel/Python doesn't support pidfds """
+        try:
+            return os.pidfd_open(proc.pid)
+        except (AttributeError, OSError):
+            return None
+
+    def _run_and_sample(self, argv, cwd, rail_name, period):
+        """
+        Runs the workload and samples the rail every period seconds from this same thread, sleeping
+        until the workload exits or the next sample is due.
+        stdout is discarded. stderr goes to a temporary file that is only read back if the workload fails.
+        Returns (returncode, stderr).
+        """
+        with tempfile.TemporaryFile() as err_file:
+            with self._spawn(argv, cwd, err_file) as proc:
+                pidfd = self._open_pidfd(proc)
+                try:
+                    next_t = time.monotonic()
+                    while proc.poll() is None:
+                        now = time.monotonic()
+                        if now >= next_t:
+                            self._sample(rail_name)
+                            next_t += period
+                            # Don't burst to catch up if a read stalled for longer than a period
+                            if now - next_t > period:
+                                next_t = now + period
+
+                        timeout = max(0.0, next_t - time.monotonic())
+                        if pidfd is not None:
+                            select.select((pidfd,), (), (), timeout)
+                        else:
+                            try:
+                                proc.wait(timeout)
+                            except subprocess.TimeoutExpired:
+                                pass
+                finally:
+                    if pidfd is not None:
+                        os.close(pidfd)
+
+            returncode = proc.returncode
+            stderr = ''
+            if returncode != 0:
+                err_file.seek(0)
+                stderr = err_file.read().decode(errors='replace')
+
+        return returncode, stderr
 
     def run_workload_sweep(self, workload_name, steps=25, step_size_v=0.01):
         """
@@ -41,50 +219,58 @@ class ExperimentRunner:
         nominal_v = job['nominal_voltage']
         
         full_cmd = f"{job['executable']} {job['args']}"
+        # Split once and run without a shell, model output is dropped
+        argv = [job['executable'], *shlex.split(job['args'])]
         cwd = job['cwd']
+        period = self.hal.poll_periods.get(rail, POLL_PERIOD_S)
 
         print(f"\n=== Starting Sweep: {workload_name} on {rail} ===")
         print(f"Base Command: {full_cmd}")
         print(f"Working Dir : {cwd}")
 
-        current_v = nominal_v
+        # Every step's voltage, checked and turned into its I2C write once before the sweep starts
+        voltages = [nominal_v - i * step_size_v for i in range(steps + 1)]
+        plan = self.hal.plan_voltages(rail, voltages)
+
+        # Pin before starting the writer so it shares the monitor core rather than the workload's
+        if self._monitor_core is not None:
+            self._pin({self._monitor_core})
+
+        self._writer = threading.Thread(target=self._csv_writer, daemon=True)
+        self._writer.start()
 
         try:
-            for i in range(steps + 1):
+            for i, current_v in enumerate(voltages):
                 print(f"\n--- Step {i}: Setting {current_v:.3f}V ---")
                 
-                # Set voltage via hardware abstraction layer
-                if not self.hal.set_voltage(rail, current_v):
+                # Set voltage via hardware abstraction layer, the plan ends where the limits do
+                if i >= len(plan) or not self.hal.write_planned_voltage(rail, plan[i]):
                     print("Aborting sweep due to voltage set failure (or safety limit).")
                     break
                 
                 time.sleep(0.5)
 
-                # Initialize monitor thread
-                self.stop_monitoring.clear()
-                self.log_data = [] # Clear previous log
-                monitor_thread = threading.Thread(target=self._monitor_loop, args=(rail,))
-                monitor_thread.start()
+                self._start_step_log(workload_name, current_v)
 
-                # Run model
+                # Run model, telemetry is sampled while waiting on it
                 try:
                     print("Running model...")
                     
-                    start_t = time.time()
-                    result = subprocess.run(full_cmd, shell=True, cwd=cwd, check=False, capture_output=True, text=True)
-                    duration = time.time() - start_t
+                    start_ns = time.monotonic_ns()
+                    returncode, stderr = self._run_and_sample(argv, cwd, rail, period)
+                    duration = (time.monotonic_ns() - start_ns) / 1e9
                     
                     # Exit code -6 is SIGABRT (The GUI crash) ignore this crash
-                    if result.returncode == 0 or result.returncode == -6:
+                    if returncode == 0 or returncode == -6:
                         status = "SUCCESS"
-                        if result.returncode == -6:
+                        if returncode == -6:
                             status = "SUCCESS (GUI Crash Ignored)"
                         print(f"Result: {status} (Time: {duration:.2f}s)")
                         
                     else:
                         # Actual fail
-                        print(f"Result: CRASH/FAIL (Exit Code {result.returncode})")
-                        print(f"Stderr: {result.stderr}") 
+                        print(f"Result: CRASH/FAIL (Exit Code {returncode})")
+                        print(f"Stderr: {stderr}") 
                         break 
 
                 except FileNotFoundError:
@@ -92,15 +278,8 @@ class ExperimentRunner:
                     break
                 
                 finally:
-                    # Stop monitoring
-                    self.stop_monitoring.set()
-                    monitor_thread.join()
-                    
                     # Store results
-                    self._save_csv(workload_name, current_v, self.log_data)
-
-                # Step down voltage
-                current_v -= step_size_v
+                    self._save_csv()
 
         except KeyboardInterrupt:
             print("\nTest Interrupted by User.")
@@ -108,22 +287,18 @@ class ExperimentRunner:
         finally:
             print(f"\n=== Test Finished. Resetting {rail} to {nominal_v:.3f}V ===")
             self.hal.set_voltage(rail, nominal_v)
+            self.hal.close()
+            # Let the writer finish the queued CSVs
+            self._csv_q.put(None)
+            self._writer.join()
+            self._report_saved()
 
-    def _save_csv(self, workload, voltage, data):
-        filename = f"log_{workload}_{voltage:.3f}V.csv"
-        if not data: 
+    def _save_csv(self):
+        # Queue whatever is still buffered for this step, its result is reported once it's written
+        self._flush_samples(last=True)
+        if not self._csv_rows:
             print("No data captured to save.")
-            return
-        
-        keys = data[0].keys()
-        try:
-            with open(filename, 'w', newline='') as f:
-                dict_writer = csv.DictWriter(f, fieldnames=keys)
-                dict_writer.writeheader()
-                dict_writer.writerows(data)
-            print(f"Saved data to {filename}")
-        except IOError as e:
-            print(f"Error saving CSV: {e}")
+        self._report_saved()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="FPGA Undervolting Framework")